@@ -0,0 +1,550 @@
+"""
+Slumber audio backends
+
+The playback code talks to an audio backend rather than to pygame directly.  A backend loads sound files and hands
+back sound objects that know how to play (with a fade in), fadeout, set_volume and stop -- the same subset of the
+pygame.mixer.Sound API that the playback commands use.
+
+Three backends are provided:
+
+* pygame -- real audio output through the pygame mixer
+* null -- no audio at all, it only keeps track of what would be playing and when
+* wav -- mixes everything that would be playing into a WAV file, in real time
+"""
+
+import array
+import logging
+import math
+import os
+import time
+import warnings
+import wave
+
+# pygame is only needed by the pygame backend, the other backends run fine on machines without it
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+# audioop speeds up mixing in the wav backend, it is deprecated and was removed in python 3.13 so we fall back to
+# mixing with arrays without it
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    try:
+        import audioop
+    except ImportError:
+        audioop = None
+
+
+class BackendException(Exception):
+    pass
+
+class BackendUnavailable(BackendException):
+    pass
+
+class UnsupportedSound(BackendException):
+    pass
+
+
+class AudioSound(object):
+    """
+    The interface of the sound objects returned by AudioBackend.load
+    """
+
+    def play(self, loops=0, fade_ms=0):
+        """
+        Start playing the sound
+
+        :param loops: How many times to repeat the sound after the first play, -1 repeats forever
+        :param fade_ms: Fade the sound in from silence over this many milliseconds
+        """
+        raise NotImplementedError
+
+    def fadeout(self, time_ms):
+        """
+        Fade the sound out to silence over time_ms milliseconds and then stop it
+        """
+        raise NotImplementedError
+
+    def set_volume(self, volume):
+        """
+        Set the volume of the sound, between 0.0 and 1.0
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        """
+        Stop the sound immediately
+        """
+        raise NotImplementedError
+
+
+class AudioBackend(object):
+    """
+    The interface that all audio backends implement
+    """
+
+    name = None
+
+    def init(self, loop):
+        """
+        Prepare the backend for use
+
+        :param loop: The event loop that playback runs on
+        """
+        pass
+
+    def quit(self):
+        """
+        Release anything held by the backend, this is registered as a shutdown callback
+        """
+        pass
+
+    def load(self, path):
+        """
+        Load a sound file
+
+        :param path: The path to a wav file
+        :returns: An AudioSound
+        """
+        raise NotImplementedError
+
+
+class PygameBackend(AudioBackend):
+    """
+    Plays audio through the pygame mixer
+    """
+
+    name = 'pygame'
+
+    def __init__(self, cache=None):
+        """
+        :param cache: A PCMCache to load mixer-ready sound data from, if None every sound is decoded when loaded
+        """
+        self.cache = cache
+
+    def init(self, loop):
+        if not pygame:
+            raise BackendUnavailable("The pygame backend requires pygame to be installed")
+
+        # force the sdl video driver to be 'dummy' driver so we don't get a pygame window
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+        pygame.init()
+
+    def quit(self):
+        pygame.quit()
+
+    def load(self, path):
+        # pygame.mixer.Sound already implements the AudioSound interface
+        if self.cache is None:
+            return pygame.mixer.Sound(path)
+
+        # the cached data is only valid for the mixer settings it was converted to, if the mixer failed to initialize
+        # there are no settings and we leave it to pygame to report the problem
+        params = pygame.mixer.get_init()
+        if params is None:
+            return pygame.mixer.Sound(path)
+
+        data = self.cache.get(path, params)
+        if data is not None:
+            return pygame.mixer.Sound(buffer=data)
+
+        sound = pygame.mixer.Sound(path)
+        self.cache.put(path, params, sound.get_raw())
+        return sound
+
+
+class NullSound(AudioSound):
+    """
+    A sound that doesn't make any noise, it just records what happens to it with the backend
+    """
+
+    def __init__(self, backend, path):
+        self.backend = backend
+        self.path = path
+        self.volume = 1.0
+        self.playing = False
+
+    def play(self, loops=0, fade_ms=0):
+        self.playing = True
+        self.backend.record(self, 'play', loops, fade_ms)
+
+    def fadeout(self, time_ms):
+        self.backend.record(self, 'fadeout', time_ms)
+
+    def set_volume(self, volume):
+        self.volume = volume
+        self.backend.record(self, 'set_volume', volume)
+
+    def stop(self):
+        self.playing = False
+        self.backend.record(self, 'stop')
+
+
+class NullBackend(AudioBackend):
+    """
+    A backend that produces no audio
+
+    Every operation is appended to self.events as a (seconds since init, path, action, args) tuple so the timing of
+    playback can be inspected without a sound card.
+    """
+
+    name = 'null'
+
+    def __init__(self):
+        self.log = logging.getLogger('backend')
+        self.started = time.time()
+        self.events = []
+
+    def init(self, loop):
+        self.started = time.time()
+
+    def record(self, sound, action, *args):
+        elapsed = time.time() - self.started
+        self.log.debug("%.3f %s %s%s", elapsed, sound.path, action, args)
+        self.events.append((elapsed, sound.path, action, args))
+
+    def load(self, path):
+        sound = NullSound(self, path)
+        self.record(sound, 'load')
+        return sound
+
+
+class FileSinkSound(NullSound):
+    """
+    A sound that is mixed into the output of a FileSinkBackend
+
+    Changes made to the sound are queued with the backend and take effect at the output frame they were made at,
+    the next time the backend renders.  All positions are measured in frames of the backend output.
+    """
+
+    def __init__(self, backend, path, data):
+        """
+        :param data: The 16-bit PCM data of the sound, in native byte order
+        """
+        super(FileSinkSound, self).__init__(backend, path)
+        self.data = data
+        self.frame_width = backend.channels * 2
+        self.length = len(data) // self.frame_width
+        self.level = 1.0
+        self.loops = 0
+        self.position = 0
+        self.fade_in = None
+        self.fade_out = None
+
+    def play(self, loops=0, fade_ms=0):
+        self.backend.queue(self, 'play', loops, fade_ms)
+        super(FileSinkSound, self).play(loops, fade_ms)
+
+    def fadeout(self, time_ms):
+        self.backend.queue(self, 'fadeout', time_ms)
+        super(FileSinkSound, self).fadeout(time_ms)
+
+    def set_volume(self, volume):
+        self.backend.queue(self, 'set_volume', volume)
+        super(FileSinkSound, self).set_volume(volume)
+
+    def stop(self):
+        self.backend.queue(self, 'stop')
+        super(FileSinkSound, self).stop()
+
+    def apply(self, frame, action, *args):
+        """
+        Apply a queued change to the mixing state of the sound
+        """
+        if action == 'play':
+            loops, fade_ms = args
+            self.loops = loops
+            self.position = 0
+            self.fade_in = (frame, self.backend.ms_to_frames(fade_ms))
+            self.fade_out = None
+            self.backend.add_active(self)
+        elif action == 'fadeout':
+            self.fade_out = (frame, self.backend.ms_to_frames(args[0]))
+        elif action == 'set_volume':
+            self.level = args[0]
+        elif action == 'stop':
+            self.backend.remove_active(self)
+
+    def gain(self, frame):
+        """
+        The gain to apply at the given output frame, or None if the sound has finished fading out
+        """
+        gain = self.level
+
+        if self.fade_in is not None:
+            start, duration = self.fade_in
+            if duration > 0 and frame - start < duration:
+                gain *= float(frame - start) / duration
+
+        if self.fade_out is not None:
+            start, duration = self.fade_out
+            if frame - start >= duration:
+                return None
+            gain *= 1.0 - (float(frame - start) / duration)
+
+        return gain
+
+    def read(self, frames):
+        """
+        Returns the next frames of the sound, looping as needed.  Fewer frames are returned once it has finished.
+        """
+        parts = []
+        while frames > 0:
+            if self.position >= self.length:
+                if self.loops == 0:
+                    break
+                if self.loops > 0:
+                    self.loops -= 1
+                self.position = 0
+
+            count = min(frames, self.length - self.position)
+            parts.append(self.data[self.position * self.frame_width:(self.position + count) * self.frame_width])
+            self.position += count
+            frames -= count
+
+        return b''.join(parts)
+
+    def mix(self, frames, first_frame):
+        """
+        Render the next frames of this sound, the first of which is first_frame of the backend output
+
+        The gain is held constant over each block of the backend so the work can be done by audioop.
+
+        :returns: A tuple of the rendered data, which may be shorter than requested, and False once the sound has
+                  finished playing
+        """
+        data = self.read(frames)
+        block = self.backend.block_frames
+        parts = []
+
+        for offset in range(0, len(data) // self.frame_width, block):
+            gain = self.gain(first_frame + offset + block // 2)
+            if gain is None:
+                return b''.join(parts), False
+            parts.append(pcm_mul(data[offset * self.frame_width:(offset + block) * self.frame_width], gain))
+
+        return b''.join(parts), len(data) == frames * self.frame_width
+
+
+class FileSinkBackend(AudioBackend):
+    """
+    A backend that writes what would have been played into a 16-bit WAV file
+
+    The output advances with the wall clock, so a run of the event loop produces a file as long as the run itself.
+    Rendering only happens periodically from the event loop, changes made to sounds in between are queued along with
+    the frame they were made at.  The header is updated on every render so a run that is killed still leaves a valid
+    file behind, and since a WAV file can't hold more than 4GiB the output moves on to a new numbered file (e.g.
+    output.1.wav) before it gets that big.  Sounds must be 16-bit and have the same number of channels and frame rate as the
+    output; slumber sounds are all 16-bit, 44100Hz, 2 channel files.
+    """
+
+    name = 'wav'
+
+    # how often, in seconds, the event loop renders the output file
+    render_interval = 1
+
+    # the gain of each sound is held constant over blocks of this many seconds
+    block_interval = 0.01
+
+    def __init__(self, path, frequency=44100, channels=2):
+        """
+        :param path: The WAV file to write
+        :param frequency: The frame rate of the output
+        :param channels: The number of channels in the output
+        """
+        self.log = logging.getLogger('backend')
+        self.path = path
+        self.frequency = frequency
+        self.channels = channels
+        self.block_frames = max(1, int(frequency * self.block_interval))
+        # the RIFF header stores the size of everything after the first 8 bytes in 32 bits, 36 of them are header
+        self.max_file_frames = (0xFFFFFFFF - 36) // (channels * 2)
+        self.output = None
+        self.output_file = None
+        self.output_number = 0
+        self.output_frames = 0
+        self.loop = None
+        self.started = time.time()
+        self.frame = 0
+        self.active = []
+        self.pending = []
+        self.events = []
+
+    def init(self, loop):
+        self.loop = loop
+        self.output_number = 0
+        self.open_output()
+        self.started = time.time()
+        self.frame = 0
+        self.loop.add_callback(self.render_periodically, deadline={'seconds': self.render_interval})
+
+    def quit(self):
+        if self.output is None:
+            return
+        self.render()
+        self.close_output()
+
+    def output_path(self):
+        """
+        The path of the current output file, the first one is the path we were given and later ones are numbered
+        """
+        if self.output_number == 0:
+            return self.path
+        base, extension = os.path.splitext(self.path)
+        return '%s.%d%s' % (base, self.output_number, extension)
+
+    def open_output(self):
+        path = self.output_path()
+        self.log.debug("Writing output to %s", path)
+        # we open the file ourselves so that it can be flushed after each render
+        self.output_file = open(path, 'wb')
+        self.output = wave.open(self.output_file, 'wb')
+        self.output.setnchannels(self.channels)
+        self.output.setsampwidth(2)
+        self.output.setframerate(self.frequency)
+        self.output_frames = 0
+
+    def close_output(self):
+        self.output.close()
+        self.output_file.close()
+        self.output = None
+        self.output_file = None
+
+    def current_frame(self):
+        """
+        The output frame that corresponds to the current time
+        """
+        return max(self.frame, int((time.time() - self.started) * self.frequency))
+
+    def record(self, sound, action, *args):
+        elapsed = float(self.current_frame()) / self.frequency
+        self.log.debug("%.3f %s %s%s", elapsed, sound.path, action, args)
+        self.events.append((elapsed, sound.path, action, args))
+
+    def queue(self, sound, action, *args):
+        """
+        Queue a change to a sound, to be applied when rendering reaches the current frame
+        """
+        self.pending.append((self.current_frame(), sound, action, args))
+
+    def load(self, path):
+        source = wave.open(path, 'rb')
+        try:
+            if source.getsampwidth() != 2:
+                raise UnsupportedSound("%s is not a 16-bit wav file" % path)
+            if source.getnchannels() != self.channels or source.getframerate() != self.frequency:
+                raise UnsupportedSound("%s is %dHz with %d channels, the output is %dHz with %d channels" % (
+                    path, source.getframerate(), source.getnchannels(), self.frequency, self.channels))
+            if source.getnframes() == 0:
+                raise UnsupportedSound("%s does not contain any audio" % path)
+
+            data = source.readframes(source.getnframes())
+        finally:
+            source.close()
+
+        # the wave module converts the little endian wav data to native byte order, which is what we mix in
+        sound = FileSinkSound(self, path, data)
+        self.record(sound, 'load')
+        return sound
+
+    def ms_to_frames(self, time_ms):
+        return int(time_ms * self.frequency / 1000)
+
+    def add_active(self, sound):
+        if sound not in self.active:
+            self.active.append(sound)
+
+    def remove_active(self, sound):
+        if sound in self.active:
+            self.active.remove(sound)
+
+    def render_periodically(self):
+        if self.output is None:
+            return
+        self.render()
+        self.loop.add_callback(self.render_periodically, deadline={'seconds': self.render_interval})
+
+    def render(self):
+        """
+        Mix the active sounds into the output file up to the current time
+        """
+        if self.output is None:
+            return
+
+        target = self.current_frame()
+        frame_width = self.channels * 2
+
+        while self.frame < target:
+            while self.pending and self.pending[0][0] <= self.frame:
+                _, sound, action, args = self.pending.pop(0)
+                sound.apply(self.frame, action, *args)
+
+            # render up to the next queued change, in chunks of a second so that long waits don't need a huge buffer
+            end = min(target, self.frame + self.frequency)
+            if self.pending:
+                end = min(end, self.pending[0][0])
+
+            if self.output_frames >= self.max_file_frames:
+                self.close_output()
+                self.output_number += 1
+                self.open_output()
+            end = min(end, self.frame + self.max_file_frames - self.output_frames)
+
+            frames = end - self.frame
+            mixed = b'\0' * (frames * frame_width)
+
+            for sound in list(self.active):
+                data, playing = sound.mix(frames, self.frame)
+                if data:
+                    mixed = pcm_add(mixed, data + b'\0' * (len(mixed) - len(data)))
+                if not playing:
+                    self.active.remove(sound)
+                    sound.playing = False
+
+            # writeframes keeps the header up to date with what has been written so far
+            self.output.writeframes(mixed)
+            self.output_frames += frames
+            self.frame = end
+
+        self.output_file.flush()
+
+
+def pcm_to_array(data):
+    samples = array.array('h')
+    if hasattr(samples, 'frombytes'):
+        samples.frombytes(data)
+    else:
+        samples.fromstring(data)
+    return samples
+
+def array_to_pcm(samples):
+    return samples.tobytes() if hasattr(samples, 'tobytes') else samples.tostring()
+
+def clip(sample):
+    return max(-32768, min(32767, sample))
+
+def pcm_mul(data, factor):
+    """
+    Multiply 16-bit native byte order PCM data by factor, clipping the result
+    """
+    if audioop:
+        return audioop.mul(data, 2, factor)
+
+    return array_to_pcm(array.array('h', [clip(int(math.floor(sample * factor))) for sample in pcm_to_array(data)]))
+
+def pcm_add(first, second):
+    """
+    Add two fragments of 16-bit native byte order PCM data of the same length, clipping the result
+    """
+    if audioop:
+        return audioop.add(first, second, 2)
+
+    return array_to_pcm(array.array('h', [clip(a + b) for a, b in zip(pcm_to_array(first), pcm_to_array(second))]))
+
+
+BACKENDS = dict(
+    (backend.name, backend)
+    for backend in (PygameBackend, NullBackend, FileSinkBackend)
+)
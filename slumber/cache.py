@@ -0,0 +1,212 @@
+"""
+Slumber PCM cache
+
+Decoding a wav file through pygame.mixer.Sound converts it to the format the mixer was initialized with, and that
+happens again every time slumber starts.  The cache stores the converted PCM data on disk so that later loads are
+just a sequential read of the raw data, which can be handed straight to pygame.mixer.Sound(buffer=...).
+
+Entries are keyed by the checksum of the source file along with the mixer parameters, so changing either one of
+them automatically misses the old entry.  To avoid hashing every sound at startup the checksums are remembered in
+an index along with the size and modification time of the file they were computed from.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+class PCMCache(object):
+    """
+    An on-disk cache of mixer-ready PCM data
+
+    Usage::
+
+        cache = PCMCache.for_sounds('sounds')
+
+        data = cache.get(path, pygame.mixer.get_init())
+        if data is None:
+            ...
+            cache.put(path, pygame.mixer.get_init(), sound.get_raw())
+    """
+
+    index_name = 'index.json'
+
+    # temporary files older than this many seconds were left behind by a failed write and are removed by prune
+    stale_temp_age = 60 * 60
+
+    @classmethod
+    def for_sounds(cls, sounds_directory):
+        """
+        Returns a cache that lives next to the given sounds directory
+        """
+        sounds_directory = os.path.abspath(sounds_directory).rstrip(os.sep)
+        return cls(os.path.join(os.path.dirname(sounds_directory), '.slumber-cache'))
+
+    def __init__(self, directory):
+        """
+        :param directory: The directory to store the cache in, it is created if it doesn't exist
+        """
+        self.log = logging.getLogger('cache')
+        self.directory = directory
+        self.index_file = os.path.join(directory, self.index_name)
+        self.index = {}
+        # set when the cache can't be written to, for example when the sounds are in a read only location
+        self.disabled = False
+
+        try:
+            with open(self.index_file) as index:
+                self.index = json.load(index)
+        except (IOError, OSError, ValueError):
+            self.log.debug("No usable cache index in %s", directory)
+
+        self.prune()
+
+    def prune(self):
+        """
+        Forget sounds that no longer exist, remove the entries that no longer belong to any sound and remove
+        temporary files left behind by failed writes
+        """
+        if not os.path.isdir(self.directory):
+            return
+
+        try:
+            missing = [path for path in self.index if not os.path.exists(path)]
+            if missing:
+                for path in missing:
+                    self.log.debug("Forgetting %s, it no longer exists", path)
+                    del self.index[path]
+                self.save_index()
+
+            digests = set(entry[2] for entry in self.index.values())
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name.endswith('.pcm') and name.split('_', 1)[0] not in digests:
+                    self.log.debug("Removing orphaned cache entry %s", name)
+                    os.remove(path)
+                elif name.endswith('.tmp') and time.time() - os.path.getmtime(path) > self.stale_temp_age:
+                    self.log.debug("Removing stale temporary file %s", name)
+                    os.remove(path)
+        except (IOError, OSError):
+            self.log.debug("Unable to prune the cache in %s", self.directory)
+
+    def checksum(self, path):
+        """
+        Returns the checksum of the file at path, re-using the one in the index if the file hasn't changed
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+
+        try:
+            size, mtime, digest = self.index[path]
+        except (KeyError, ValueError):
+            pass
+        else:
+            if size == stat.st_size and mtime == stat.st_mtime:
+                return digest
+
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as source:
+            for block in iter(lambda: source.read(1024 * 1024), b''):
+                sha1.update(block)
+        digest = sha1.hexdigest()
+
+        previous = self.index.get(path)
+        self.index[path] = [stat.st_size, stat.st_mtime, digest]
+        self.save_index()
+
+        # the file changed, drop the entries for its old contents unless another file has the same contents
+        if previous and previous[2] != digest:
+            if not any(entry[2] == previous[2] for entry in self.index.values()):
+                self.remove_entries(previous[2])
+
+        return digest
+
+    def entry_path(self, digest, params):
+        return os.path.join(self.directory, '%s_%s.pcm' % (digest, '_'.join(str(param) for param in params)))
+
+    def get(self, path, params):
+        """
+        Returns the cached PCM data for path, or None if it is not in the cache
+
+        :param path: The path to the source wav file
+        :param params: The mixer parameters, as returned by pygame.mixer.get_init()
+        """
+        if self.disabled:
+            return None
+
+        try:
+            entry = self.entry_path(self.checksum(path), params)
+            with open(entry, 'rb') as cached:
+                data = cached.read()
+        except (IOError, OSError):
+            self.log.debug("Cache miss for %s", path)
+            return None
+
+        self.log.debug("Cache hit for %s (%s)", path, entry)
+        return data
+
+    def put(self, path, params, data):
+        """
+        Store the PCM data for path in the cache
+
+        :param path: The path to the source wav file
+        :param params: The mixer parameters, as returned by pygame.mixer.get_init()
+        :param data: The raw PCM data, as returned by pygame.mixer.Sound.get_raw()
+        """
+        if self.disabled:
+            return
+
+        try:
+            digest = self.checksum(path)
+            entry = self.entry_path(digest, params)
+
+            # entries for other mixer parameters are stale now that we're using these ones
+            self.remove_entries(digest, keep=entry)
+
+            # write to a temporary file first so that an interrupted write never leaves a partial entry behind
+            self.write_file(entry, data, 'wb')
+        except (IOError, OSError) as e:
+            self.log.warning("Unable to write to the cache in %s, it is disabled for this run: %s", self.directory, e)
+            self.disabled = True
+            return
+
+        self.log.debug("Cached %s (%s)", path, entry)
+
+    def remove_entries(self, digest, keep=None):
+        """
+        Remove the cache entries for a checksum
+
+        :param digest: The checksum of the source file
+        :param keep: The path of an entry that should not be removed
+        """
+        prefix = '%s_' % digest
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if name.startswith(prefix) and name.endswith('.pcm') and entry != keep:
+                self.log.debug("Removing stale cache entry %s", entry)
+                os.remove(entry)
+
+    def save_index(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        self.write_file(self.index_file, json.dumps(self.index), 'w')
+
+    def write_file(self, path, data, mode):
+        """
+        Atomically replace the file at path with data, by way of a temporary file that is removed if anything fails
+        """
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, mode) as temp:
+                temp.write(data)
+            os.rename(temp_path, path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
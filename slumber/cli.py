@@ -6,8 +6,11 @@ import argparse
 import logging
 import signal
 
+from slumber.backends import BACKENDS, FileSinkBackend, PygameBackend
+from slumber.cache import PCMCache
 from slumber.eventloop import EventLoop
 from slumber.playback import PlaybackManager
+from slumber.profiling import PROFILERS
 
 def main():
     """
@@ -20,8 +23,27 @@ def main():
                         help='The directory to load sounds from.  It should be organized into numbered directories.')
     parser.add_argument('--timer', '-t', required=False, type=int,
                         help='Set a sleep timer in minutes.')
+    parser.add_argument('--backend', '-b', default='pygame', choices=sorted(BACKENDS),
+                        help='The audio backend to play sounds through.  Defaults to pygame.')
+    parser.add_argument('--output', '-o', required=False,
+                        help='The WAV file to write when using the wav backend.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Decode every sound at startup instead of using the cache of mixer-ready sound data.')
+    parser.add_argument('--profile', '-p', required=False, choices=sorted(PROFILERS),
+                        help='Profile the event loop.  USR2 toggles the profiler and writes out the results.')
+    parser.add_argument('--profile-output', default='slumber-profile',
+                        help='The path prefix of the profile output files.  Defaults to slumber-profile.')
     args = parser.parse_args()
 
+    if args.backend == FileSinkBackend.name:
+        if not args.output:
+            parser.error('--output is required when using the wav backend')
+        backend = FileSinkBackend(args.output)
+    elif args.backend == PygameBackend.name and not args.no_cache:
+        backend = PygameBackend(cache=PCMCache.for_sounds(args.sounds))
+    else:
+        backend = BACKENDS[args.backend]()
+
     if args.debug:
         log_format = '%(asctime)s %(name)-10s %(levelname)-8s %(message)s'
         log_level = logging.DEBUG
@@ -53,25 +75,38 @@ def main():
 
         signal.signal(signal.SIGUSR1, debug_interrupt)
 
+    # use SystemExit since that's already caught for debug
+    def stexit(sig, frame):
+      raise SystemExit
+
     # set a sleep timer in minutes, minimalist
     if args.timer:
-        # use SystemExit since that's already caught for debug
-        def stexit(sig, frame):
-          raise SystemExit
         signal.signal(signal.SIGALRM, stexit)
         signal.alarm(args.timer * 60)
 
     loop = EventLoop.current()
 
     # create the playback manager
-    playback_manager = PlaybackManager(loop, args.sounds)
+    playback_manager = PlaybackManager(loop, args.sounds, backend)
     loop.add_callback(playback_manager.start)
 
+    if args.profile:
+        profiler = PROFILERS[args.profile](args.profile_output)
+        profiler.install_toggle()
+        profiler.start()
+
+        # make sure the profile is written when we're stopped with kill or by a service manager
+        signal.signal(signal.SIGTERM, stexit)
+
     # run our event loop, this will block
     try:
         loop.start()
     except (KeyboardInterrupt, SystemExit):
         loop.stop()
+    finally:
+        if args.profile and profiler.running:
+            profiler.stop()
+            profiler.dump()
 
 if __name__ == '__main__':
     main()
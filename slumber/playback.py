@@ -1,7 +1,7 @@
 """
 Slumber playback code
 
-Makes use of the pygame mixer
+Sounds are played through an audio backend, see slumber.backends
 """
 
 import copy
@@ -9,19 +9,9 @@ import logging
 import os
 import random
 
-# when we're running during continuous integration we don't actually need pygame (we assume it works)
-# it is also mocked out in most of our tests, so we can just set it to False during CI
-try:
-    import pygame
-except ImportError:
-    import os
-    if 'CI' in os.environ and os.environ['CI'] == 'true':
-        pygame = False
-    else:
-        raise
-
 from glob import glob
 
+from slumber.backends import PygameBackend
 from slumber.eventloop import coroutine
 
 class PlaybackException(Exception):
@@ -156,7 +146,7 @@ class PlaybackCommands(object):
 
             self.sound_file = self.new_sound()
             self.log.info("[%s] Playing %s", self.stage, self.sound_file)
-            self.sounds[self.sound_file] = pygame.mixer.Sound(self.sound_file)
+            self.sounds[self.sound_file] = self.manager.backend.load(self.sound_file)
             self.sounds[self.sound_file].play(-1, fade_ms=fade_duration)
 
         self.command_wait(fade_duration / 1000)
@@ -181,7 +171,7 @@ class PlaybackCommands(object):
             self.swapping = True
             self.swap_sound_file = self.new_sound()
             self.log.info("[%s] Swapping with %s over %d seconds", self.stage, self.swap_sound_file, duration)
-            self.sounds[self.swap_sound_file] = pygame.mixer.Sound(self.swap_sound_file)
+            self.sounds[self.swap_sound_file] = self.manager.backend.load(self.swap_sound_file)
             self.sounds[self.swap_sound_file].play(-1, fade_ms=duration * 1000)
             self.sounds[self.sound_file].fadeout(duration * 1000)
 
@@ -201,16 +191,18 @@ class PlaybackManager(object):
     The playback manager takes care of starting a PlaybackCommand object for each stage
     """
 
-    def __init__(self, loop, sounds_directory):
+    def __init__(self, loop, sounds_directory, backend=None):
         """
         Initialize the playback manager
 
         :param sounds_directory: The directory where we can find our sounds.  It should be organized into numbered
                                  directories for each of the stages.
+        :param backend: The AudioBackend to play sounds through, defaults to the pygame backend
         """
         self.log = logging.getLogger('playback')
 
         self.loop = loop
+        self.backend = backend if backend is not None else PygameBackend()
 
         # this will be used to track our currently playing sounds
         self.commands = {}
@@ -218,12 +210,9 @@ class PlaybackManager(object):
         self.stages = []
         self.load_playback_commands(sounds_directory)
 
-        # force the sdl video driver to be 'dummy' driver so we don't get a pygame window
-        os.environ["SDL_VIDEODRIVER"] = "dummy"
-
-        # init pygame
-        pygame.init()
-        self.loop.add_shutdown_callback(pygame.quit)
+        # init the audio backend
+        self.backend.init(self.loop)
+        self.loop.add_shutdown_callback(self.backend.quit)
 
     def load_playback_commands(self, sounds_directory):
         """
@@ -0,0 +1,227 @@
+"""
+Slumber profiling support
+
+Two profilers are available, both of which can be toggled on and off while slumber is running:
+
+* cprofile -- the deterministic cProfile profiler, writes pstats output
+* sample -- a low overhead statistical profiler driven by SIGPROF, writes pstats output and a collapsed stack file
+  that can be fed straight to flamegraph.pl
+
+Usage::
+
+    profiler = PROFILERS['sample']('slumber-profile')
+    profiler.install_toggle()
+    profiler.start()
+    ...
+    profiler.stop()
+    profiler.dump()
+"""
+
+import cProfile
+import logging
+import pstats
+import signal
+import time
+
+
+class Profiler(object):
+    """
+    The interface shared by the profilers
+    """
+
+    name = None
+
+    def __init__(self, prefix):
+        """
+        :param prefix: The path prefix of the files that are written, extensions are added to it
+        """
+        self.log = logging.getLogger('profiler')
+        self.prefix = prefix
+        self.running = False
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def dump(self):
+        raise NotImplementedError
+
+    def toggle(self, sig=None, frame=None):
+        """
+        Start the profiler if it is stopped, otherwise stop it and write out what it has collected so far
+
+        This is usable as a signal handler
+        """
+        if self.running:
+            self.log.info("Stopping %s profiler", self.name)
+            self.stop()
+            self.dump()
+        else:
+            self.log.info("Starting %s profiler", self.name)
+            self.start()
+
+    def install_toggle(self, sig=signal.SIGUSR2):
+        """
+        Toggle the profiler whenever sig is received
+        """
+        signal.signal(sig, self.toggle)
+
+
+class CProfiler(Profiler):
+    """
+    Profiles every function call using cProfile
+    """
+
+    name = 'cprofile'
+
+    def __init__(self, prefix):
+        super(CProfiler, self).__init__(prefix)
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.running = True
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.running = False
+
+    def dump(self):
+        path = '%s.pstats' % self.prefix
+        self.profile.dump_stats(path)
+        self.log.info("Wrote profile to %s", path)
+
+
+class SamplingProfiler(Profiler):
+    """
+    Periodically samples the stack of the main thread
+
+    The samples are taken on SIGPROF, which is delivered based on the CPU time used by the whole process, including
+    other threads such as the SDL mixer thread.  To keep that time from being charged to whatever the main thread
+    happens to be doing, usually sleeping in the idle event loop, each sample is weighted by the CPU time the main
+    thread itself used since the previous sample and samples where it used none are dropped.  Without
+    time.thread_time (before python 3.7) every sample counts as one interval.
+    """
+
+    name = 'sample'
+
+    def __init__(self, prefix, interval=0.005):
+        """
+        :param interval: The number of seconds of CPU time between samples
+        """
+        super(SamplingProfiler, self).__init__(prefix)
+        self.interval = interval
+        # maps a stack, as a tuple of (filename, line number, function name) from the outermost frame in, to a list
+        # of the number of times it was sampled and the seconds of main thread CPU time those samples account for
+        self.samples = {}
+        self.last_thread_time = None
+        # the SIGPROF handler and timer that were in place before we started, restored when we stop
+        self.previous_handler = None
+        self.previous_timer = None
+
+    def thread_time(self):
+        """
+        The CPU time used by the main thread, or None if it can't be measured
+        """
+        if hasattr(time, 'thread_time'):
+            return time.thread_time()
+        return None
+
+    def start(self):
+        self.running = True
+        self.last_thread_time = self.thread_time()
+        self.previous_handler = signal.signal(signal.SIGPROF, self.sample)
+        self.previous_timer = signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+
+        # a handler that wasn't installed from python is reported as None and can't be restored, use the default
+        handler = self.previous_handler
+        signal.signal(signal.SIGPROF, handler if handler is not None else signal.SIG_DFL)
+        signal.setitimer(signal.ITIMER_PROF, *self.previous_timer)
+        self.running = False
+
+    def sample(self, sig, frame):
+        # signal handlers always run in the main thread, so this is the time it has used since the last sample
+        now = self.thread_time()
+        if now is None:
+            elapsed = self.interval
+        else:
+            elapsed = now - self.last_thread_time
+            self.last_thread_time = now
+            if elapsed <= 0:
+                return
+
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack.reverse()
+
+        stack = tuple(stack)
+        count, seconds = self.samples.get(stack, (0, 0.0))
+        self.samples[stack] = [count + 1, seconds + elapsed]
+
+    def create_stats(self):
+        """
+        Convert the samples into the stats dictionary format used by cProfile, so that pstats can load them
+
+        Each sample counts as a call, lasting the CPU time it accounts for, to every function on the sampled stack.
+        """
+        self.stats = {}
+
+        for stack, (count, elapsed) in self.samples.items():
+            seen = set()
+
+            for index, func in enumerate(stack):
+                calls, _, total, cumulative, callers = self.stats.get(func, (0, 0, 0.0, 0.0, {}))
+
+                # recursive functions only get cumulative time once per sample
+                if func not in seen:
+                    seen.add(func)
+                    calls += count
+                    cumulative += elapsed
+                    if index > 0:
+                        caller = callers.get(stack[index - 1], (0, 0, 0.0, 0.0))
+                        callers[stack[index - 1]] = (caller[0] + count, caller[1] + count,
+                                                     caller[2], caller[3] + elapsed)
+
+                if index == len(stack) - 1:
+                    total += elapsed
+
+                self.stats[func] = (calls, calls, total, cumulative, callers)
+
+    def collapsed(self):
+        """
+        Returns the samples as lines in the collapsed stack format used by flamegraph.pl, weighted by microseconds
+        of main thread CPU time
+        """
+        lines = []
+        for stack, (count, elapsed) in sorted(self.samples.items()):
+            frames = ['%s (%s:%d)' % (name, filename, line) for filename, line, name in stack]
+            lines.append('%s %d' % (';'.join(frames), int(round(elapsed * 1000000))))
+        return lines
+
+    def dump(self):
+        if not self.samples:
+            self.log.info("No samples were collected")
+            return
+
+        path = '%s.pstats' % self.prefix
+        pstats.Stats(self).dump_stats(path)
+        self.log.info("Wrote profile to %s", path)
+
+        path = '%s.collapsed' % self.prefix
+        with open(path, 'w') as collapsed:
+            collapsed.write('\n'.join(self.collapsed()) + '\n')
+        self.log.info("Wrote collapsed stacks to %s", path)
+
+
+PROFILERS = dict(
+    (profiler.name, profiler)
+    for profiler in (CProfiler, SamplingProfiler)
+)
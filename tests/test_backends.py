@@ -0,0 +1,218 @@
+import array
+import os
+import shutil
+import tempfile
+import wave
+
+from unittest import TestCase
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from slumber.backends import FileSinkBackend, NullBackend, UnsupportedSound, pcm_add, pcm_mul
+from slumber.eventloop import EventLoop
+
+def write_wav(path, samples, channels=2, frequency=44100):
+    data = array.array('h', samples)
+
+    output = wave.open(path, 'wb')
+    output.setnchannels(channels)
+    output.setsampwidth(2)
+    output.setframerate(frequency)
+    output.writeframes(data.tobytes() if hasattr(data, 'tobytes') else data.tostring())
+    output.close()
+
+def read_pcm(data):
+    samples = array.array('h')
+    if hasattr(samples, 'frombytes'):
+        samples.frombytes(data)
+    else:
+        samples.fromstring(data)
+    return samples
+
+def read_wav(path):
+    source = wave.open(path, 'rb')
+    data = read_pcm(source.readframes(source.getnframes()))
+    source.close()
+    return data
+
+class NullBackendTests(TestCase):
+    def test_events(self):
+        """
+        Test that the null backend records what happens to its sounds
+        """
+        backend = NullBackend()
+        backend.init(EventLoop())
+
+        sound = backend.load('sound.wav')
+        sound.play(-1, fade_ms=5000)
+        self.assertTrue(sound.playing)
+        sound.set_volume(0.5)
+        self.assertEqual(sound.volume, 0.5)
+        sound.fadeout(5000)
+        sound.stop()
+        self.assertFalse(sound.playing)
+
+        self.assertEqual([event[1:] for event in backend.events], [
+            ('sound.wav', 'load', ()),
+            ('sound.wav', 'play', (-1, 5000)),
+            ('sound.wav', 'set_volume', (0.5,)),
+            ('sound.wav', 'fadeout', (5000,)),
+            ('sound.wav', 'stop', ()),
+        ])
+
+class FileSinkBackendTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sound_file = os.path.join(self.directory, 'sound.wav')
+        self.output_file = os.path.join(self.directory, 'output.wav')
+
+        # 4 frames of a constant tone, with the right channel half as loud as the left
+        write_wav(self.sound_file, [1000, 500] * 4, frequency=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_render(self):
+        """
+        Test that playing sounds are mixed into the output file
+        """
+        backend = FileSinkBackend(self.output_file, frequency=100)
+        backend.init(EventLoop())
+
+        sound = backend.load(self.sound_file)
+        sound.set_volume(0.5)
+        sound.play(-1)
+
+        # pretend half a second has gone by
+        backend.started -= 0.5
+        backend.render()
+        backend.quit()
+
+        samples = read_wav(self.output_file)
+        self.assertTrue(len(samples) >= 100)
+        self.assertEqual(list(samples[-100:]), [500, 250] * 50)
+
+    def test_fadeout(self):
+        """
+        Test that a sound stops once it has faded out
+        """
+        backend = FileSinkBackend(self.output_file, frequency=100)
+        backend.init(EventLoop())
+
+        sound = backend.load(self.sound_file)
+        sound.play(-1)
+        sound.fadeout(100)
+
+        backend.started -= 2
+        backend.render()
+        backend.quit()
+
+        self.assertFalse(sound.playing)
+        self.assertEqual(backend.active, [])
+
+        samples = read_wav(self.output_file)
+        self.assertEqual(list(samples[-10:]), [0] * 10)
+
+    def test_queued_changes(self):
+        """
+        Test that changes to a sound take effect at the frame they were made, not when the output is rendered
+        """
+        backend = FileSinkBackend(self.output_file, frequency=100)
+        backend.init(EventLoop())
+
+        sound = backend.load(self.sound_file)
+        sound.play(-1)
+
+        # half a second later the volume is changed, but nothing is rendered until a second has gone by
+        backend.started -= 0.5
+        sound.set_volume(0.5)
+        self.assertEqual(backend.frame, 0)
+
+        backend.started -= 0.5
+        backend.render()
+        backend.quit()
+
+        samples = read_wav(self.output_file)
+        self.assertEqual(list(samples[:100]), [1000, 500] * 50)
+        self.assertEqual(list(samples[100:200]), [500, 250] * 50)
+
+    def test_header(self):
+        """
+        Test that the header of the output file is kept up to date while it is being written
+        """
+        backend = FileSinkBackend(self.output_file, frequency=100)
+        backend.init(EventLoop())
+
+        backend.started -= 0.5
+        backend.render()
+
+        output = wave.open(self.output_file, 'rb')
+        self.assertEqual(output.getnframes(), backend.frame)
+        output.close()
+
+        backend.quit()
+
+    def test_rotate(self):
+        """
+        Test that the output moves on to a new file when the current one is full
+        """
+        backend = FileSinkBackend(self.output_file, frequency=100)
+        backend.max_file_frames = 40
+        backend.init(EventLoop())
+
+        backend.started -= 1
+        backend.render()
+        backend.quit()
+
+        lengths = []
+        for name in ('output.wav', 'output.1.wav', 'output.2.wav'):
+            output = wave.open(os.path.join(self.directory, name), 'rb')
+            lengths.append(output.getnframes())
+            output.close()
+
+        self.assertEqual(lengths[:2], [40, 40])
+        self.assertEqual(sum(lengths), backend.frame)
+
+    def test_without_audioop(self):
+        """
+        Test that mixing falls back to arrays when audioop isn't available
+        """
+        loud = array.array('h', [30000, -30000, 1001, -1001])
+        loud = loud.tobytes() if hasattr(loud, 'tobytes') else loud.tostring()
+
+        with patch('slumber.backends.audioop', None):
+            self.assertEqual(list(read_pcm(pcm_mul(loud, 0.5))), [15000, -15000, 500, -501])
+            self.assertEqual(list(read_pcm(pcm_add(loud, loud))), [32767, -32768, 2002, -2002])
+
+            backend = FileSinkBackend(self.output_file, frequency=100)
+            backend.init(EventLoop())
+
+            sound = backend.load(self.sound_file)
+            sound.set_volume(0.5)
+            sound.play(-1)
+
+            backend.started -= 0.5
+            backend.render()
+            backend.quit()
+
+        samples = read_wav(self.output_file)
+        self.assertEqual(list(samples[-100:]), [500, 250] * 50)
+
+    def test_unsupported(self):
+        """
+        Test that sounds in a different format than the output are refused
+        """
+        backend = FileSinkBackend(self.output_file, frequency=44100)
+        self.assertRaises(UnsupportedSound, backend.load, self.sound_file)
+
+    def test_empty(self):
+        """
+        Test that sounds without any audio are refused
+        """
+        empty_file = os.path.join(self.directory, 'empty.wav')
+        write_wav(empty_file, [], frequency=100)
+
+        backend = FileSinkBackend(self.output_file, frequency=100)
+        self.assertRaises(UnsupportedSound, backend.load, empty_file)
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+import time
+
+from unittest import TestCase
+try:
+    from unittest.mock import patch, call
+except ImportError:
+    from mock import patch, call
+
+from slumber.backends import PygameBackend
+from slumber.cache import PCMCache
+
+class PCMCacheTests(TestCase):
+    params = (44100, -16, 2)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sounds_dir = os.path.join(self.directory, 'sounds')
+        os.mkdir(self.sounds_dir)
+
+        self.sound_file = os.path.join(self.sounds_dir, 'sound.wav')
+        open(self.sound_file, 'w').write("RIFF0WAV")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_for_sounds(self):
+        """
+        Test that the cache lives next to the sounds directory
+        """
+        cache = PCMCache.for_sounds(self.sounds_dir + os.sep)
+        self.assertEqual(cache.directory, os.path.join(self.directory, '.slumber-cache'))
+
+    def test_get_put(self):
+        """
+        Test storing and retrieving PCM data
+        """
+        cache = PCMCache.for_sounds(self.sounds_dir)
+        self.assertEqual(cache.get(self.sound_file, self.params), None)
+
+        cache.put(self.sound_file, self.params, b'pcm data')
+        self.assertEqual(cache.get(self.sound_file, self.params), b'pcm data')
+
+        # a new cache object picks up the existing index and data
+        cache = PCMCache.for_sounds(self.sounds_dir)
+        self.assertTrue(os.path.abspath(self.sound_file) in cache.index)
+        self.assertEqual(cache.get(self.sound_file, self.params), b'pcm data')
+
+    def test_invalidation(self):
+        """
+        Test that changing the mixer settings or the source file misses the cache and removes stale entries
+        """
+        cache = PCMCache.for_sounds(self.sounds_dir)
+        cache.put(self.sound_file, self.params, b'pcm data')
+
+        # different mixer settings
+        self.assertEqual(cache.get(self.sound_file, (22050, -16, 2)), None)
+        cache.put(self.sound_file, (22050, -16, 2), b'other pcm data')
+        self.assertEqual(cache.get(self.sound_file, self.params), None)
+        self.assertEqual(cache.get(self.sound_file, (22050, -16, 2)), b'other pcm data')
+
+        # different source contents, with a different size so the change is seen regardless of mtime resolution
+        open(self.sound_file, 'w').write("RIFF1WAVE")
+        self.assertEqual(cache.get(self.sound_file, (22050, -16, 2)), None)
+
+        entries = [name for name in os.listdir(cache.directory) if name.endswith('.pcm')]
+        self.assertEqual(entries, [])
+
+    def test_prune(self):
+        """
+        Test that opening the cache removes the entries of sounds that no longer exist
+        """
+        cache = PCMCache.for_sounds(self.sounds_dir)
+        cache.put(self.sound_file, self.params, b'pcm data')
+        os.remove(self.sound_file)
+
+        cache = PCMCache.for_sounds(self.sounds_dir)
+        self.assertEqual(cache.index, {})
+
+        entries = [name for name in os.listdir(cache.directory) if name.endswith('.pcm')]
+        self.assertEqual(entries, [])
+
+    def test_failed_write(self):
+        """
+        Test that a failed write doesn't leave a temporary file behind
+        """
+        cache = PCMCache.for_sounds(self.sounds_dir)
+
+        with patch('os.rename', side_effect=OSError("No space left on device")):
+            cache.put(self.sound_file, self.params, b'pcm data')
+
+        self.assertTrue(cache.disabled)
+        self.assertEqual([name for name in os.listdir(cache.directory) if name.endswith('.tmp')], [])
+
+    def test_prune_temporary(self):
+        """
+        Test that opening the cache removes stale temporary files but leaves recent ones alone
+        """
+        cache = PCMCache.for_sounds(self.sounds_dir)
+        cache.put(self.sound_file, self.params, b'pcm data')
+
+        stale = os.path.join(cache.directory, 'stale.tmp')
+        recent = os.path.join(cache.directory, 'recent.tmp')
+        open(stale, 'w').write("partial")
+        open(recent, 'w').write("partial")
+        old = time.time() - PCMCache.stale_temp_age - 60
+        os.utime(stale, (old, old))
+
+        PCMCache.for_sounds(self.sounds_dir)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_unwritable(self):
+        """
+        Test that the cache disables itself when it can't be written to
+        """
+        # a file where the cache directory should be makes it impossible to create
+        cache_dir = os.path.join(self.directory, 'not-a-directory')
+        open(cache_dir, 'w').write("")
+
+        cache = PCMCache(cache_dir)
+        cache.put(self.sound_file, self.params, b'pcm data')
+        self.assertTrue(cache.disabled)
+        self.assertEqual(cache.get(self.sound_file, self.params), None)
+
+    @patch('slumber.backends.pygame')
+    def test_pygame_backend_no_mixer(self, pygame):
+        """
+        Test that the pygame backend skips the cache when the mixer isn't initialized
+        """
+        pygame.mixer.get_init.return_value = None
+
+        cache = PCMCache.for_sounds(self.sounds_dir)
+        backend = PygameBackend(cache=cache)
+        backend.load(self.sound_file)
+
+        pygame.mixer.Sound.assert_called_once_with(self.sound_file)
+        self.assertEqual(cache.index, {})
+
+    @patch('slumber.backends.pygame')
+    def test_pygame_backend(self, pygame):
+        """
+        Test that the pygame backend fills and then uses the cache
+        """
+        pygame.mixer.get_init.return_value = self.params
+        pygame.mixer.Sound.return_value.get_raw.return_value = b'pcm data'
+
+        backend = PygameBackend(cache=PCMCache.for_sounds(self.sounds_dir))
+        backend.load(self.sound_file)
+        backend.load(self.sound_file)
+
+        pygame.mixer.Sound.assert_has_calls([
+            call(self.sound_file),
+            call().get_raw(),
+            call(buffer=b'pcm data'),
+        ])
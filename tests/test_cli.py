@@ -0,0 +1,52 @@
+import os
+import shutil
+import signal
+import sys
+import tempfile
+
+from unittest import TestCase
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from slumber.cli import main
+from slumber.eventloop import EventLoop
+
+class MainTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sounds_dir = os.path.join(self.directory, 'sounds')
+        self.prefix = os.path.join(self.directory, 'profile')
+
+        stage_dir = os.path.join(self.sounds_dir, '0')
+        os.makedirs(stage_dir)
+        open(os.path.join(stage_dir, 'sound.wav'), 'w').write("RIFF0WAV")
+        open(os.path.join(stage_dir, 'SLUMBER'), 'w').write("play\nwait 10")
+
+        self.signals = dict((sig, signal.getsignal(sig)) for sig in (signal.SIGTERM, signal.SIGUSR2))
+
+    def tearDown(self):
+        for sig, handler in self.signals.items():
+            signal.signal(sig, handler)
+
+        # don't leave our playback callbacks on the shared event loop
+        loop = EventLoop.current()
+        loop.callbacks = []
+        loop.shutdown_callbacks = []
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_profile_sigterm(self):
+        """
+        Test that the profile is written when slumber is stopped with SIGTERM
+        """
+        loop = EventLoop.current()
+        loop.add_callback(lambda: os.kill(os.getpid(), signal.SIGTERM), {'seconds': 0.25})
+
+        argv = ['slumber', '-s', self.sounds_dir, '-b', 'null', '-p', 'cprofile', '--profile-output', self.prefix]
+        with patch.object(sys, 'argv', argv):
+            main()
+
+        self.assertFalse(loop.running)
+        self.assertTrue(os.path.exists(self.prefix + '.pstats'))
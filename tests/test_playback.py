@@ -10,6 +10,7 @@ try:
 except ImportError:
     from mock import MagicMock, patch, call
 
+from slumber.backends import NullBackend
 from slumber.eventloop import EventLoop
 from slumber.playback import PlaybackCommands, PlaybackManager
 
@@ -30,10 +31,13 @@ class PlaybackManagerTests(TestCase):
     def tearDown(self):
         shutil.rmtree(self.sounds_dir, ignore_errors=True)
 
-    @patch('slumber.playback.pygame')
-    def test_init(self, pygame):
+    def test_init(self):
         loop = EventLoop.current()
-        manager = PlaybackManager(loop, self.sounds_dir)
+        backend = NullBackend()
+        manager = PlaybackManager(loop, self.sounds_dir, backend)
+
+        self.assertEqual(manager.backend, backend)
+        self.assertEqual(loop.shutdown_callbacks[-1], backend.quit)
 
         self.assertEqual(manager.stages, self.stages)
 
@@ -87,8 +91,7 @@ class PlaybackCommandsTests(TestCase):
         ])
 
     @patch('slumber.playback.PlaybackCommands.command_wait')
-    @patch('slumber.playback.pygame')
-    def test_start(self, pygame, command_wait):
+    def test_start(self, command_wait):
         """
         Test processing of the commands
         """
@@ -115,7 +118,7 @@ class PlaybackCommandsTests(TestCase):
         loop.start()
 
         # make sure things worked as expected
-        pygame.mixer.Sound.assert_has_calls([
+        manager.backend.load.assert_has_calls([
             call(commands.sound_file),
             call().play(-1, fade_ms=5000),
             call().fadeout(5000),
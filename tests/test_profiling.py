@@ -0,0 +1,127 @@
+import os
+import pstats
+import hashlib
+import shutil
+import signal
+import tempfile
+import threading
+import time
+
+from unittest import TestCase
+
+from slumber.profiling import CProfiler, SamplingProfiler
+
+def busy():
+    total = 0
+    for x in range(200000):
+        total += x
+    return total
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.prefix = os.path.join(self.directory, 'profile')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_cprofile_toggle(self):
+        """
+        Test that toggling the cProfile profiler off writes out the stats
+        """
+        profiler = CProfiler(self.prefix)
+        profiler.toggle()
+        self.assertTrue(profiler.running)
+        busy()
+        profiler.toggle()
+        self.assertFalse(profiler.running)
+
+        stats = pstats.Stats(self.prefix + '.pstats')
+        self.assertTrue(any(func[2] == 'busy' for func in stats.stats))
+
+    def test_sample_stats(self):
+        """
+        Test converting samples into pstats and collapsed stack output
+        """
+        main = ('cli.py', 10, 'main')
+        start = ('eventloop.py', 90, 'start')
+        drain = ('eventloop.py', 37, 'drain_generator')
+
+        profiler = SamplingProfiler(self.prefix, interval=0.01)
+        profiler.samples = {
+            (main, start): [3, 0.03],
+            (main, start, drain): [1, 0.01],
+        }
+        profiler.dump()
+
+        stats = pstats.Stats(self.prefix + '.pstats').stats
+        self.assertEqual(stats[main][:2], (4, 4))
+        self.assertAlmostEqual(stats[main][2], 0.0)
+        self.assertAlmostEqual(stats[main][3], 0.04)
+        self.assertAlmostEqual(stats[start][2], 0.03)
+        self.assertAlmostEqual(stats[drain][3], 0.01)
+        self.assertEqual(list(stats[drain][4].keys()), [start])
+
+        self.assertEqual(open(self.prefix + '.collapsed').read().splitlines(), [
+            'main (cli.py:10);start (eventloop.py:90) 30000',
+            'main (cli.py:10);start (eventloop.py:90);drain_generator (eventloop.py:37) 10000',
+        ])
+
+    def test_sampling(self):
+        """
+        Test that the sampling profiler collects stacks while it is running
+        """
+        profiler = SamplingProfiler(self.prefix, interval=0.001)
+        profiler.start()
+        while not profiler.samples:
+            busy()
+        profiler.stop()
+
+        self.assertFalse(profiler.running)
+        self.assertTrue(any(stack[-1][2] in ('busy', 'test_sampling') for stack in profiler.samples))
+
+    def test_sampling_background_thread(self):
+        """
+        Test that CPU time used by other threads isn't charged to the sleeping main thread
+        """
+        data = b'x' * (1024 * 1024)
+        done = []
+
+        # hashing large buffers releases the GIL, like the SDL mixer thread this burns CPU outside of python
+        def burn():
+            while not done:
+                hashlib.sha256(data).digest()
+
+        thread = threading.Thread(target=burn)
+        thread.start()
+        try:
+            # poll the way the idle event loop does, which gives pending samples a chance to be taken
+            profiler = SamplingProfiler(self.prefix)
+            profiler.start()
+            for x in range(50):
+                time.sleep(0.01)
+            profiler.stop()
+        finally:
+            done.append(True)
+            thread.join()
+
+        charged = sum(elapsed for count, elapsed in profiler.samples.values())
+        self.assertTrue(charged < 0.05, "%f seconds were charged to the main thread" % charged)
+
+    def test_sampling_restores_signal(self):
+        """
+        Test that stopping the sampling profiler restores the SIGPROF handler and timer it replaced
+        """
+        def handler(sig, frame):
+            pass
+
+        previous = signal.signal(signal.SIGPROF, handler)
+        try:
+            profiler = SamplingProfiler(self.prefix)
+            profiler.start()
+            profiler.stop()
+
+            self.assertEqual(signal.getsignal(signal.SIGPROF), handler)
+            self.assertEqual(signal.getitimer(signal.ITIMER_PROF), (0.0, 0.0))
+        finally:
+            signal.signal(signal.SIGPROF, previous)